@@ -1,36 +1,53 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import contextmanager
+import datetime
 from datetime import date
 import json
 from pathlib import Path
-from typing import List, Optional, Union, Iterator
+from typing import (
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    Union,
+)
 import yaml
 
-from linkml_runtime.dumpers import json_dumper
-import rdflib
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
 import modos_schema.datamodel as model
 import zarr.hierarchy
 import zarr
 import re
 
-from pysam import AlignedSegment, VariantRecord
-
-from .rdf import attrs_to_graph
 from .storage import (
     add_metadata_group,
     list_zarr_items,
     LocalStorage,
     S3Storage,
 )
-from .file_utils import extract_metadata, extraction_formats
 from .helpers import (
     class_from_name,
     dict_to_instance,
     ElementType,
     GenomicFileSuffix,
+    instance_to_dict,
     set_haspart_relationship,
     UserElementType,
     update_haspart_id,
 )
-from .cram import slice_genomics, slice_remote_genomics
+
+# NOTE: Modules for RDF export and genomic files pull in heavy
+# dependencies, they are imported in the methods using them.
+if TYPE_CHECKING:
+    from pysam import AlignedSegment, VariantRecord
+    import rdflib
 
 
 class MODO:
@@ -64,12 +81,14 @@ class MODO:
         id: Optional[str] = None,
         name: Optional[str] = None,
         description: Optional[str] = None,
-        creation_date: date = date.today(),
-        last_update_date: date = date.today(),
-        has_assay: List = [],
+        creation_date: Optional[date] = None,
+        last_update_date: Optional[date] = None,
+        has_assay: Optional[List] = None,
         source_uri: Optional[str] = None,
     ):
         self.htsget_endpoint = htsget_endpoint
+        self._defer_consolidate = False
+        self._pending_consolidate = False
 
         if s3_endpoint and not htsget_endpoint:
             htsget_endpoint = re.sub(r"s3$", "htsget", s3_endpoint)
@@ -84,17 +103,43 @@ class MODO:
             fields = {
                 "@type": "MODO",
                 "id": self.id,
-                "creation_date": str(creation_date),
-                "last_update_date": str(last_update_date),
+                "creation_date": str(creation_date or date.today()),
+                "last_update_date": str(last_update_date or date.today()),
                 "name": name,
                 "description": description,
                 "has_assay": has_assay,
                 "source_uri": source_uri,
             }
-            for key, val in fields.items():
-                if val:
-                    self.zarr["/"].attrs[key] = val
+            self.zarr.attrs.update(
+                {key: val for key, val in fields.items() if val}
+            )
+            self._consolidate()
+
+    @contextmanager
+    def batch(self):
+        """Defer metadata consolidation until the end of the block.
+        Use this when applying many changes at once, the
+        consolidated metadata is rewritten only once on exit, and
+        only if something changed.
+        """
+        if self._defer_consolidate:
+            yield self
+            return
+        self._defer_consolidate = True
+        try:
+            yield self
+        finally:
+            self._defer_consolidate = False
+            if self._pending_consolidate:
+                self._consolidate()
+
+    def _consolidate(self):
+        """Consolidate zarr metadata, unless deferred by a batch."""
+        if self._defer_consolidate:
+            self._pending_consolidate = True
+        else:
             zarr.consolidate_metadata(self.zarr.store)
+            self._pending_consolidate = False
 
     @property
     def zarr(self) -> zarr.hierarchy.Group:
@@ -106,29 +151,100 @@ class MODO:
 
     @property
     def metadata(self) -> dict:
-        # Auto refresh metadata to match data before reading
-        zarr.consolidate_metadata(self.zarr.store)
-        root = zarr.convenience.open_consolidated(self.zarr.store)
-
+        root = self._metadata_root()
         if isinstance(root, zarr.core.Array):
             raise ValueError("Root must be a group. Empty archive?")
 
         # Get flat dictionary with all attrs, easier to search
         group_attrs = dict()
         # Document object itself
-        root_id = root["/"].attrs["id"]
-        group_attrs[root_id] = dict(root["/"].attrs)
+        group_attrs[root.attrs["id"]] = dict(root.attrs)
         for subgroup in root.groups():
             group_type = subgroup[0]
             for name, value in list_zarr_items(subgroup[1]):
                 group_attrs[f"{group_type}/{name}"] = dict(value.attrs)
         return group_attrs
 
+    def _metadata_root(self) -> zarr.hierarchy.Group:
+        """Return the root group to read metadata from.
+        Consolidated metadata is read in a single request. The live
+        hierarchy is used instead when it is missing or may be outdated
+        because consolidation is deferred by a batch.
+        """
+        if not self._defer_consolidate:
+            try:
+                return zarr.convenience.open_consolidated(
+                    self.zarr.store, mode="r"
+                )
+            except KeyError:
+                pass
+        # The root handle caches its attributes, other handles may
+        # have updated them.
+        self.zarr.attrs.refresh()
+        return self.zarr
+
+    def _consolidated_metadata(self) -> Optional[dict]:
+        """Return the consolidated zarr metadata, keyed by store path.
+        None is returned if it is missing or may be outdated because
+        consolidation is deferred by a batch.
+        """
+        if self._defer_consolidate:
+            return None
+        try:
+            return json.loads(self.zarr.store[".zmetadata"])["metadata"]
+        except KeyError:
+            return None
+
+    def get_element_attrs(self, element_id: str) -> Optional[dict]:
+        """Return the attributes of an element, or None if there is no
+        element group at that path. They are read from the consolidated
+        metadata when it is up to date.
+
+        Examples
+        --------
+        >>> MODO("data/ex").get_element_attrs("/data/demo1/")["data_path"]
+        'demo1.cram'
+        """
+        path = zarr.util.normalize_storage_path(element_id)
+        meta = self._consolidated_metadata()
+        if meta is not None and f"{path}/.zgroup" in meta:
+            return dict(meta.get(f"{path}/.zattrs", {}))
+        element = self.zarr.get(path)
+        if isinstance(element, zarr.hierarchy.Group):
+            return dict(element.attrs)
+        return None
+
+    def element_names(self) -> set[str]:
+        """Return the ids of all elements without their type prefix.
+        They are read from the consolidated metadata when it is up to
+        date, which avoids walking the whole hierarchy.
+
+        Examples
+        --------
+        >>> sorted(MODO("data/ex").element_names())
+        ['assay1', 'calls1', 'demo1', 'ex', 'reference1', 'sample1']
+        """
+        meta = self._consolidated_metadata()
+        if meta is None:
+            return {id.rsplit("/", 1)[-1] for id in self.metadata.keys()}
+
+        names = set()
+        if ".zattrs" in meta:
+            names.add(meta[".zattrs"]["id"].rsplit("/", 1)[-1])
+        for key in meta:
+            path, _, leaf = key.rpartition("/")
+            # elements are nested below their type group
+            if leaf in (".zgroup", ".zarray") and "/" in path:
+                names.add(path.rsplit("/", 1)[-1])
+        return names
+
     def knowledge_graph(
         self, uri_prefix: Optional[str] = None
     ) -> rdflib.Graph:
         """Return an RDF graph of the metadata. All identifiers
         are converted to valid URIs if needed."""
+        from .rdf import attrs_to_graph
+
         if uri_prefix is None:
             uri_prefix = f"file://{self.path.name}/"
         kg = attrs_to_graph(self.metadata, uri_prefix=uri_prefix)
@@ -139,35 +255,46 @@ class MODO:
         meta = self.metadata
         # Pretty print metadata contents as yaml
 
-        return yaml.dump(meta, sort_keys=False)
+        return yaml.dump(meta, Dumper=YamlDumper, sort_keys=False)
 
-    def list_files(self) -> List[Path]:
-        """Lists files in the archive recursively (except for the zarr file)."""
-        return [fi for fi in self.storage.list()]
+    def list_files(self) -> Iterator[Path]:
+        """Lists files in the archive recursively (except for the zarr file).
+        Files are yielded as they are found."""
+        yield from self.storage.list()
 
     def list_arrays(self):
         """Lists arrays in the archive recursively."""
-        root = zarr.convenience.open_consolidated(self.zarr.store)
-        return root.tree()
+        return self._metadata_root().tree()
 
     def query(self, query: str):
         """Use SPARQL to query the metadata graph"""
         return self.knowledge_graph().query(query)
 
+    def list_by_type(self, type_name: str) -> List[str]:
+        """Lists identifiers of elements of a given type in the archive.
+
+        Examples
+        --------
+        >>> MODO("data/ex").list_by_type("Assay")
+        ['assay/assay1']
+        """
+        return [
+            id
+            for id, attrs in self.metadata.items()
+            if attrs.get("@type") == type_name
+        ]
+
     def list_samples(self):
         """Lists samples in the archive."""
-        res = self.query("SELECT ?s WHERE { ?s a modos:Sample }")
-        samples = []
-        for row in res:
-            for val in row:
-                samples.append(
-                    str(val).removeprefix(f"file://{self.path.name}/")
-                )
-        return samples
+        return self.list_by_type("Sample")
 
-    def update_date(self, date: date = date.today()):
-        """update last_update_date attribute"""
+    def update_date(self, date: Optional[date] = None):
+        """update last_update_date attribute, defaults to today"""
+        if date is None:
+            # NOTE: the argument shadows datetime.date
+            date = datetime.date.today()
         self.zarr.attrs.update(last_update_date=str(date))
+        self._consolidate()
 
     def remove_element(self, element_id: str):
         """Remove an element from the archive, along with any files
@@ -190,16 +317,25 @@ class MODO:
         # Remove element group
         del self.zarr[element_id]
 
-        # Remove links from other elements
-        for elem, attrs in self.metadata.items():
-            for key, value in attrs.items():
-                if value == element_id:
-                    del self.zarr[elem].attrs[key]
-                elif isinstance(value, list) and element_id in value:
-                    self.zarr[elem].attrs[key] = value.remove(element_id)
+        # Remove links from other elements, one attribute write per element
+        for elem, elem_attrs in self.metadata.items():
+            unlinked = {
+                key: (
+                    [val for val in value if val != element_id]
+                    if isinstance(value, list)
+                    else value
+                )
+                for key, value in elem_attrs.items()
+                if value != element_id
+            }
+            if unlinked != elem_attrs:
+                if elem_attrs.get("@type") == "MODO":
+                    group = self.zarr
+                else:
+                    group = self.zarr[elem]
+                group.attrs.put(unlinked)
 
         self.update_date()
-        zarr.consolidate_metadata(self.zarr.store)
 
     def add_element(
         self,
@@ -228,7 +364,7 @@ class MODO:
             For example "sample/foo".
         """
         # Check that ID does not exist in modo
-        if element.id in [Path(id).name for id in self.metadata.keys()]:
+        if element.id in self.element_names():
             raise ValueError(
                 f"Please specify a unique ID. Element with ID {element.id} already exist."
             )
@@ -267,10 +403,41 @@ class MODO:
         element = update_haspart_id(element)
 
         # Add element to metadata
-        attrs = json.loads(json_dumper.dumps(element))
+        attrs = instance_to_dict(element)
         add_metadata_group(type_group, attrs)
         self.update_date()
-        zarr.consolidate_metadata(self.zarr.store)
+
+    def add_elements(self, elements: Iterable):
+        """Add multiple elements to the archive.
+        Ids are checked for uniqueness against a single read of the
+        metadata and the consolidated metadata is rewritten only once.
+
+        Parameters
+        ----------
+        elements
+            Elements to add. Each item is either an element, or a tuple
+            of arguments to add_element: (element, data_file, part_of),
+            where trailing arguments may be omitted.
+        """
+        known_ids = self.element_names()
+        # Children are grouped by parent and class, so that each
+        # parent's hasPart attribute is written once
+        links = defaultdict(list)
+        with self.batch():
+            for item in elements:
+                args = item if isinstance(item, tuple) else (item,)
+                element, data_file, part_of = (*args, None, None)[:3]
+                # Only user-facing element types can be added
+                type_name = UserElementType.from_object(element).value
+                self._add_any_element(element, data_file, known_ids=known_ids)
+                if part_of is not None:
+                    links[(part_of, element.__class__.__name__)].append(
+                        f"{type_name}/{element.id}"
+                    )
+            for (part_of, child_class), paths in links.items():
+                set_haspart_relationship(
+                    child_class, paths, self.zarr[part_of]
+                )
 
     def _add_any_element(
         self,
@@ -283,10 +450,16 @@ class MODO:
         ),
         data_file: Optional[Path] = None,
         part_of: Optional[str] = None,
+        known_ids: Optional[set[str]] = None,
     ):
-        """Add an element of any type to the storage."""
+        """Add an element of any type to the storage.
+        known_ids holds the unscoped ids already in the archive, it is
+        read from the metadata if not provided and the new id is added
+        to it."""
+        if known_ids is None:
+            known_ids = self.element_names()
         # Check that ID does not exist in modo
-        if element.id in [Path(id).name for id in self.metadata.keys()]:
+        if element.id in known_ids:
             raise ValueError(
                 f"Please specify a unique ID. Element with ID {element.id} already exist."
             )
@@ -324,10 +497,10 @@ class MODO:
         element = update_haspart_id(element)
 
         # Add element to metadata
-        attrs = json.loads(json_dumper.dumps(element))
+        attrs = instance_to_dict(element)
         add_metadata_group(type_group, attrs)
+        known_ids.add(element.id)
         self.update_date()
-        zarr.consolidate_metadata(self.zarr.store)
 
     def update_element(
         self,
@@ -365,9 +538,12 @@ class MODO:
         attrs.update(**new_items)
         self.update_date()
 
-    def enrich_metadata(self):
-        """Add metadata and corresponding elements extracted from object associated data to the MODO object"""
-        new_elements = []
+    def enrich_metadata(self) -> set[str]:
+        """Add metadata and corresponding elements extracted from object associated data to the MODO object.
+        Returns the ids of the elements that were added or updated."""
+        from .file_utils import extract_metadata, extraction_formats
+
+        # Read the metadata once and collect all changes before applying them
         instances = [
             dict_to_instance(entity | {"id": id})
             for id, entity in self.metadata.items()
@@ -375,20 +551,30 @@ class MODO:
             and entity.get("data_format") in extraction_formats
         ]
         inst_names = {inst.name: inst.id for inst in instances}
+        new_elements = []
+        updates = []
         for inst in instances:
             elements = extract_metadata(inst, self.path)
             for ele in elements:
                 # NOTE: Need to compare names here as ids differ
-                if (
-                    ele.name not in inst_names.keys()
-                    and ele not in new_elements
-                ):
+                if ele.name in inst_names.keys():
+                    updates.append((inst_names[ele.name], ele))
+                elif ele not in new_elements:
                     new_elements.append(ele)
-                    self._add_any_element(ele)
-                elif ele.name in inst_names.keys():
-                    self.update_element(inst_names[ele.name], ele)
-                else:
-                    continue
+
+        if not (new_elements or updates):
+            return set()
+        known_ids = self.element_names()
+        with self.batch():
+            for ele in new_elements:
+                self._add_any_element(ele, known_ids=known_ids)
+            for element_id, ele in updates:
+                self.update_element(element_id, ele)
+        added = {
+            f"{ElementType.from_object(ele).value}/{ele.id}"
+            for ele in new_elements
+        }
+        return added | {element_id for element_id, _ in updates}
 
     def stream_genomics(
         self,
@@ -399,9 +585,16 @@ class MODO:
     ) -> Optional[Iterator[AlignedSegment | VariantRecord]]:
         """Slices both local and remote CRAM, VCF (.vcf.gz), and BCF
         files returning an iterator or saving to local file."""
+        from .cram import slice_genomics, slice_remote_genomics
 
         # check requested genomics file exists in MODO
-        if Path(file_path) not in self.list_files():
+        try:
+            in_modo = self.storage.exists(
+                Path(file_path).relative_to(self.path)
+            )
+        except ValueError:
+            in_modo = False
+        if not in_modo:
             raise ValueError(f"{file_path} not found in {self.path}.")
 
         if self.htsget_endpoint:
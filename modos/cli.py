@@ -4,20 +4,16 @@
 
 from datetime import date
 from enum import Enum
-import json
 import os
 from pathlib import Path
-from typing import Any, List, Mapping, Optional
+import sys
+from typing import Any, Collection, Mapping, Optional
 from typing_extensions import Annotated
 
 import click
-from linkml_runtime.loaders import json_loader
 import modos_schema.datamodel as model
-import s3fs
 import typer
-import zarr
 
-from .api import MODO
 from .helpers import UserElementType
 from .introspection import (
     get_enum_values,
@@ -25,8 +21,10 @@ from .introspection import (
     get_slot_range,
     load_schema,
 )
-from .io import build_modo_from_file, parse_instance
-from .storage import add_metadata_group, init_zarr
+
+# NOTE: The API, s3fs and the linkml loaders are imported inside commands
+# to keep CLI startup fast. The datamodel is loaded through helpers
+# anyway, which Typer needs to declare the commands.
 
 
 class RdfFormat(str, Enum):
@@ -62,7 +60,7 @@ def prompt_for_slot(slot_name: str, prefix: str = "", optional: bool = False):
 
 def prompt_for_slots(
     target_class: type,
-    exclude: Optional[Mapping[str, List]] = None,
+    exclude: Optional[Mapping[str, Collection]] = None,
     # add dict with exclude
 ) -> dict[str, Any]:
     """Prompt the user to provide values for the slots of input class.
@@ -73,7 +71,7 @@ def prompt_for_slots(
         target_class
             Class to build
         exclude
-            Mapping with the name of a slot as key  and list of invalid entries as values.
+            Mapping with the name of a slot as key and a collection of invalid entries as values.
     """
 
     entries = {}
@@ -139,17 +137,23 @@ def create(
     ] = None,
 ):
     """Create a modo interactively or from a file."""
+    from linkml_runtime.loaders import json_loader
+    import s3fs
+
+    from .api import MODO
+    from .io import build_modo_from_file
+    from .storage import s3_prefix_exists
+
     typer.echo("Creating a digital object.", err=True)
     # Initialize object's directory
-    if object_directory.exists():
-        raise ValueError(f"Directory already exists: {object_directory}")
-
     if s3_endpoint:
         fs = s3fs.S3FileSystem(endpoint_url=s3_endpoint, anon=True)
-        if fs.exists(object_directory):
+        if s3_prefix_exists(fs, object_directory):
             raise ValueError(
                 f"Remote directory already exists: {object_directory}"
             )
+    elif object_directory.exists():
+        raise ValueError(f"Directory already exists: {object_directory}")
 
     # Obtain object's metadata and create object
     if from_file and meta:
@@ -190,10 +194,12 @@ def remove(
     ] = None,
 ):
     """Removes an element and its files from the modo."""
+    from .api import MODO
+
     modo = MODO(object_directory, s3_endpoint=s3_endpoint)
-    element = modo.zarr.get(element_id)
-    rm_path = element.attrs.get("data_path", [])
-    if isinstance(element, zarr.hierarchy.Group) and len(rm_path) > 0:
+    attrs = modo.get_element_attrs(element_id)
+    rm_path = (attrs or {}).get("data_path", [])
+    if len(rm_path) > 0:
         delete = typer.confirm(
             f"Removing {element_id} will permanently delete {rm_path}.\n Please confirm that you want to continue?"
         )
@@ -253,6 +259,10 @@ def add(
     ] = None,
 ):
     """Add elements to a modo."""
+    from linkml_runtime.loaders import json_loader
+
+    from .api import MODO
+    from .io import parse_instance
 
     typer.echo(f"Updating {object_directory}.", err=True)
     modo = MODO(object_directory, s3_endpoint=s3_endpoint)
@@ -265,7 +275,7 @@ def add(
     elif meta:
         obj = json_loader.loads(meta, target_class=target_class)
     else:
-        exclude = {"id": [Path(id).name for id in modo.metadata.keys()]}
+        exclude = {"id": modo.element_names()}
         filled = prompt_for_slots(target_class, exclude)
         obj = target_class(**filled)
 
@@ -301,16 +311,18 @@ def show(
     ] = False,
 ):
     """Show the contents of a modo."""
-    if s3_endpoint:
-        obj = MODO(object_directory, s3_endpoint=s3_endpoint)
-    elif os.path.exists(object_directory):
-        obj = MODO(object_directory)
-    else:
+    from .api import MODO
+
+    if not s3_endpoint and not os.path.exists(object_directory):
         raise ValueError(f"{object_directory} does not exists")
+    obj = MODO(object_directory, s3_endpoint=s3_endpoint)
     if zarr:
         out = obj.list_arrays()
     elif files:
-        out = "\n".join([str(path) for path in obj.list_files()])
+        # stream paths as they are found instead of collecting them
+        for path in obj.list_files():
+            print(path)
+        return
     else:
         out = obj.show_contents()
     print(out)
@@ -331,15 +343,23 @@ def publish(
     ] = None,
 ):
     """Export a modo as linked data. Turns all paths into URIs."""
+    from .api import MODO
+
     obj = MODO(object_directory, s3_endpoint=s3_endpoint)
-    print(
-        obj.knowledge_graph(uri_prefix=base_uri).serialize(
-            format=output_format
-        )
+    # write directly to stdout instead of building the serialized string
+    obj.knowledge_graph(uri_prefix=base_uri).serialize(
+        destination=sys.stdout.buffer,
+        format=output_format,
+        encoding="utf-8",
     )
+    sys.stdout.buffer.flush()
 
 
 # Generate a click group to autogenerate docs via sphinx-click:
 # https://github.com/tiangolo/typer/issues/200#issuecomment-795873331
-
-typer_click_object = typer.main.get_command(cli)
+# NOTE: The entry point uses cli directly, so the click group is only
+# built when the docs request it.
+def __getattr__(name: str):
+    if name == "typer_click_object":
+        return typer.main.get_command(cli)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -118,17 +118,18 @@ def slice_remote_genomics(
 def extract_cram_metadata(cram: AlignmentFile) -> List:
     """Extract metadata from the CRAM file header and
     convert specific attributes according to the modo schema."""
-    cram_head = cram.header
-    ref_list: List = []
-    for refseq in cram_head.get("SQ"):
-        refseq_mod = model.ReferenceSequence(
-            id=create_sequence_id(refseq.get("SN"), refseq.get("M5")),
-            name=refseq.get("SN"),
-            sequence_md5=refseq.get("M5"),
+    # Parse the header once, pysam rebuilds the dict on every lookup
+    cram_head = cram.header.to_dict()
+    ref_list: List = [
+        model.ReferenceSequence(
+            id=create_sequence_id(refseq["SN"], refseq["M5"]),
+            name=refseq["SN"],
+            sequence_md5=refseq["M5"],
             source_uri=refseq.get("UR"),
             description=refseq.get("DS"),
         )
-        ref_list.append(refseq_mod)
+        for refseq in cram_head.get("SQ", [])
+    ]
     # NOTE: Could also extract species name, sample name, sequencer etc. here
     return ref_list
 
@@ -148,4 +149,4 @@ def validate_cram_files(cram_path: str):
 
 def create_sequence_id(name: str, sequence_md5: str) -> str:
     """Helper function to create a unique id from a sequence name and md5 hash"""
-    return name + "_" + sequence_md5[:6]
+    return f"{name}_{sequence_md5[:6]}"
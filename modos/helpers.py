@@ -1,29 +1,66 @@
+from __future__ import annotations
+
 from enum import Enum
+from functools import lru_cache
+import os
 from pathlib import Path
 import re
-from typing import Any, Mapping, Optional, Iterator
+from typing import Any, Mapping, Optional, Iterator, TYPE_CHECKING
 from urllib.parse import urlparse
-import zarr
 
+from linkml_runtime.utils.formatutils import remove_empty_items
 import modos_schema.datamodel as model
+import zarr
 
-from .introspection import get_haspart_property, get_slot_range, load_schema
+from .introspection import (
+    get_haspart_property,
+    get_haspart_slots,
+    get_slot_range,
+    load_schema,
+)
 
 from io import BytesIO
 import tempfile
-from pysam import (
-    AlignedSegment,
-    AlignmentFile,
-    VariantFile,
-    VariantRecord,
-)
+
+# NOTE: pysam is only imported where needed to keep imports fast
+if TYPE_CHECKING:
+    from pysam import (
+        AlignedSegment,
+        AlignmentFile,
+        VariantFile,
+        VariantRecord,
+    )
+
+REGION_PATTERN = re.compile(r"^([^:]+)(:([0-9]+)?(-[0-9]*)?)?$")
+
+
+@lru_cache(1)
+def _classes_by_name() -> dict[str, type]:
+    """Map each schema class name to its datamodel class."""
+    return {name: getattr(model, name) for name in load_schema().all_classes()}
 
 
 def class_from_name(name: str):
-    class_names = list(load_schema().all_classes().keys())
-    if name not in class_names:
+    try:
+        return _classes_by_name()[name]
+    except KeyError:
         raise ValueError(f"Unknown class name: {name}")
-    return getattr(model, name)
+
+
+def instance_to_dict(element) -> dict[str, Any]:
+    """Convert a model instance to a dictionary of its non-empty slots
+    and its @type. This is the JSON representation produced by
+    linkml's json_dumper, without a round-trip through a JSON string.
+
+    Examples
+    --------
+    >>> instance_to_dict(model.Sample(id="s1", name="foo"))
+    {'id': 's1', 'name': 'foo', '@type': 'Sample'}
+    """
+    return {
+        **remove_empty_items(element, hide_protected_keys=True),
+        "@type": type(element).__name__,
+    }
 
 
 def dict_to_instance(element: Mapping[str, Any]) -> Any:
@@ -46,17 +83,16 @@ def is_full_id(element_id: str) -> bool:
     >>> is_full_id("/assay/test_assay")
     True
     """
-    etypes = [elem.value + "/" for elem in ElementType]
-    extended_etypes = etypes + ["/" + etype for etype in etypes]
-    return element_id.startswith(tuple(extended_etypes))
+    return element_id.startswith(_ELEMENT_PREFIXES)
 
 
 def set_haspart_relationship(
     child_class: str,
-    child_path: str,
+    child_path: str | list[str],
     parent_group: zarr.hierarchy.Group,
 ):
-    """Add element to the hasPart attribute of a parent zarr group"""
+    """Add element(s) to the hasPart attribute of a parent zarr group.
+    Multiple paths of the same class are written in a single update."""
     parent_type = getattr(
         model,
         parent_group.attrs.get("@type"),
@@ -68,10 +104,12 @@ def set_haspart_relationship(
         raise ValueError(
             f"Cannot make {child_path} part of {parent_group.name}: {parent_type} does not have property {has_prop}"
         )
+    if isinstance(child_path, str):
+        child_path = [child_path]
     # has_part is multivalued
-    if has_prop not in parent_group.attrs:
-        parent_group.attrs[has_prop] = []
-    parent_group.attrs[has_prop] += [child_path]
+    parent_group.attrs[has_prop] = (
+        parent_group.attrs.get(has_prop) or []
+    ) + child_path
 
 
 def update_haspart_id(
@@ -82,19 +120,16 @@ def update_haspart_id(
     | model.MODO,
 ):
     """update the id of the has_part property of an element to use the full id including its type"""
-    haspart_names = load_schema().slot_children("has_part")
-    haspart_list = [
-        haspart for haspart in haspart_names if haspart in vars(element).keys()
-    ]
-    if len(haspart_list) > 0:
-        for has_part in haspart_list:
-            haspart_type = get_slot_range(has_part)
-            type_name = ElementType.from_model_name(haspart_type).value
-            updated_ids = [
-                id if is_full_id(id) else f"{type_name}/{id}"
-                for id in getattr(element, has_part)
-            ]
-            setattr(element, has_part, updated_ids)
+    for has_part in get_haspart_slots():
+        ids = getattr(element, has_part, None)
+        if not ids:
+            continue
+        haspart_type = get_slot_range(has_part)
+        type_name = ElementType.from_model_name(haspart_type).value
+        updated_ids = [
+            id if is_full_id(id) else f"{type_name}/{id}" for id in ids
+        ]
+        setattr(element, has_part, updated_ids)
     return element
 
 
@@ -110,32 +145,16 @@ class UserElementType(str, Enum):
         self,
     ) -> type:
         """Return the target class for the element type."""
-        match self:
-            case UserElementType.SAMPLE:
-                return model.Sample
-            case UserElementType.ASSAY:
-                return model.Assay
-            case UserElementType.DATA_ENTITY:
-                return model.DataEntity
-            case UserElementType.REFERENCE_GENOME:
-                return model.ReferenceGenome
-            case _:
-                raise ValueError(f"Unknown element type: {self}")
+        return ElementType(self.value).get_target_class()
 
     @classmethod
     def from_object(cls, obj):
         """Return the element type from an object."""
-        match obj:
-            case model.Sample():
-                return UserElementType.SAMPLE
-            case model.Assay():
-                return UserElementType.ASSAY
-            case model.DataEntity():
-                return UserElementType.DATA_ENTITY
-            case model.ReferenceGenome():
-                return UserElementType.REFERENCE_GENOME
-            case _:
-                raise ValueError(f"Unknown object type: {type(obj)}")
+        elem_type = ElementType.from_object(obj)
+        try:
+            return cls(elem_type.value)
+        except ValueError:
+            raise ValueError(f"Unknown object type: {type(obj)}")
 
 
 class ElementType(str, Enum):
@@ -151,53 +170,42 @@ class ElementType(str, Enum):
         self,
     ) -> type:
         """Return the target class for the element type."""
-        match self:
-            case ElementType.SAMPLE:
-                return model.Sample
-            case ElementType.ASSAY:
-                return model.Assay
-            case ElementType.DATA_ENTITY:
-                return model.DataEntity
-            case ElementType.REFERENCE_GENOME:
-                return model.ReferenceGenome
-            case ElementType.REFERENCE_SEQUENCE:
-                return model.ReferenceSequence
-            case _:
-                raise ValueError(f"Unknown element type: {self}")
+        return _TARGET_CLASSES[self]
 
     @classmethod
     def from_object(cls, obj):
         """Return the element type from an object."""
-        match obj:
-            case model.Sample():
-                return ElementType.SAMPLE
-            case model.Assay():
-                return ElementType.ASSAY
-            case model.DataEntity():
-                return ElementType.DATA_ENTITY
-            case model.ReferenceGenome():
-                return ElementType.REFERENCE_GENOME
-            case model.ReferenceSequence():
-                return ElementType.REFERENCE_SEQUENCE
-            case _:
-                raise ValueError(f"Unknown object type: {type(obj)}")
+        # Walk the class hierarchy so that subclasses resolve too
+        for obj_class in type(obj).__mro__:
+            if obj_class in _ELEMENT_BY_CLASS:
+                return _ELEMENT_BY_CLASS[obj_class]
+        raise ValueError(f"Unknown object type: {type(obj)}")
 
     @classmethod
     def from_model_name(cls, name: str):
         """Return the element type from an object name."""
-        match name:
-            case "Sample":
-                return ElementType.SAMPLE
-            case "Assay":
-                return ElementType.ASSAY
-            case "DataEntity":
-                return ElementType.DATA_ENTITY
-            case "ReferenceGenome":
-                return ElementType.REFERENCE_GENOME
-            case "ReferenceSequence":
-                return ElementType.REFERENCE_SEQUENCE
-            case _:
-                raise ValueError(f"Unknown object type: {name}")
+        try:
+            return _ELEMENT_BY_MODEL_NAME[name]
+        except KeyError:
+            raise ValueError(f"Unknown object type: {name}")
+
+
+_TARGET_CLASSES = {
+    ElementType.SAMPLE: model.Sample,
+    ElementType.ASSAY: model.Assay,
+    ElementType.DATA_ENTITY: model.DataEntity,
+    ElementType.REFERENCE_GENOME: model.ReferenceGenome,
+    ElementType.REFERENCE_SEQUENCE: model.ReferenceSequence,
+}
+_ELEMENT_BY_CLASS = {cls: elem for elem, cls in _TARGET_CLASSES.items()}
+_ELEMENT_BY_MODEL_NAME = {
+    cls.__name__: elem for elem, cls in _TARGET_CLASSES.items()
+}
+
+# Element ids scoped to their type, with or without leading slash
+_ELEMENT_PREFIXES = tuple(f"{elem.value}/" for elem in ElementType) + tuple(
+    f"/{elem.value}/" for elem in ElementType
+)
 
 
 def is_uri(text: str):
@@ -238,7 +246,7 @@ def parse_region(
     if not region:
         reference_name, start, end = None, None, None
     else:
-        matches = re.match(r"^([^:]+)(:([0-9]+)?(-[0-9]*)?)?$", region.strip())
+        matches = REGION_PATTERN.match(region.strip())
         if not matches:
             raise ValueError(
                 f"Invalid region format: {region}. Expected 'chr:start-end' (start/end optional)"
@@ -294,13 +302,20 @@ class GenomicFileSuffix(tuple, Enum):
 def file_to_pysam_object(
     path: str, fileformat: str, reference_filename: Optional[str] = None
 ) -> VariantFile | AlignmentFile:
-    """Create a pysam AlignmentFile of VariantFile"""
+    """Create a pysam AlignmentFile of VariantFile, decompressing
+    with a few htslib threads."""
+    from pysam import AlignmentFile, VariantFile
+
+    threads = min(4, os.cpu_count() or 1)
     if fileformat == "CRAM":
         pysam_file = AlignmentFile(
-            path, "rc", reference_filename=reference_filename
+            path,
+            "rc",
+            reference_filename=reference_filename,
+            threads=threads,
         )
     elif fileformat in ("VCF", "BCF"):
-        pysam_file = VariantFile(path, "rb")
+        pysam_file = VariantFile(path, "rb", threads=threads)
     else:
         raise ValueError(
             "Unsupported input file type. Supported files: CRAM, VCF, BCF"
@@ -308,6 +323,24 @@ def file_to_pysam_object(
     return pysam_file
 
 
+def index_genomic_file(path: str, fileformat: str):
+    """Build the index file of a CRAM, VCF (.vcf.gz) or BCF file next to it."""
+    import pysam
+    from pysam import bcftools
+
+    match fileformat:
+        case "CRAM":
+            pysam.index(path)
+        case "VCF":
+            pysam.tabix_index(path, preset="vcf", force=True)
+        case "BCF":
+            bcftools.index(path)
+        case _:
+            raise ValueError(
+                "Unsupported input file type. Supported files: CRAM, VCF, BCF"
+            )
+
+
 def bytesio_to_iterator(
     bytesio_buffer: BytesIO,
     file_format: str,
@@ -316,36 +349,59 @@ def bytesio_to_iterator(
 ) -> Iterator[AlignedSegment | VariantRecord]:
     """Takes a BytesIO buffer and returns a pysam
     AlignedSegment or VariantRecord iterator"""
-    # Create a temporary file to write the bytesio data
-    with tempfile.NamedTemporaryFile() as temp_file:
-        # Write the contents of the BytesIO buffer to the temporary file
-        temp_file.write(bytesio_buffer.getvalue())
+    from pysam.utils import SamtoolsError
+
+    # Write the bytesio data to a temporary directory, so that
+    # index files built next to it are cleaned up as well
+    with tempfile.TemporaryDirectory() as temp_dir:
+        suffix = ".vcf.gz" if file_format == "VCF" else f".{file_format}"
+        temp_path = str(Path(temp_dir) / f"slice{suffix.lower()}")
+        with open(temp_path, "wb") as temp_file:
+            temp_file.write(bytesio_buffer.getbuffer())
+
+        if region is None:
+            # Open the temporary file as a pysam.AlignmentFile/VarianFile object
+            yield from file_to_pysam_object(
+                path=temp_path,
+                fileformat=file_format,
+                reference_filename=reference_filename,
+            )
+            return
 
-        # Seek to the beginning of the temporary file
-        temp_file.seek(0)
+        chrom, start, end = parse_region(region)
+        # Let htslib seek to the region through the index when possible
+        try:
+            index_genomic_file(temp_path, file_format)
+        except (OSError, ValueError, SamtoolsError):
+            indexed = False
+        else:
+            indexed = True
 
-        # Open the temporary file as a pysam.AlignmentFile/VarianFile object
         pysam_iter = file_to_pysam_object(
-            path=temp_file.name,
+            path=temp_path,
             fileformat=file_format,
             reference_filename=reference_filename,
         )
-        chrom, start, end = parse_region(region)
+        if indexed:
+            yield from pysam_iter.fetch(chrom, start, end)
+            return
+
+        # Fall back to filtering records without an index, keeping
+        # records that overlap the region like fetch does
         if file_format in ("VCF", "BCF"):
             get_chrom = lambda r: r.chrom
             get_start = lambda r: r.start
+            get_end = lambda r: r.stop
         else:
             get_chrom = lambda r: r.reference_name
             get_start = lambda r: r.reference_start
+            # unmapped reads have no end, htslib treats them as length 1
+            get_end = lambda r: r.reference_end or r.reference_start + 1
 
         for record in pysam_iter:
-            if region is None:
-                yield record
-                continue
-
             bad_chrom = get_chrom(record) != chrom
-            bad_start = start is not None and (get_start(record) < start)
-            bad_end = end is not None and (get_start(record) > end)
+            bad_start = start is not None and (get_end(record) <= start)
+            bad_end = end is not None and (get_start(record) >= end)
 
             if any([bad_chrom, bad_start, bad_end]):
                 continue
@@ -358,7 +414,12 @@ def iter_to_file(
     output_filename: str,
     reference_filename: Optional[str] = None,
 ):
+    """Write genomic records to a local file, compressing
+    with one htslib thread per available core."""
+    from pysam import AlignmentFile, VariantFile
+
     out_fileformat = GenomicFileSuffix.from_path(Path(output_filename)).name
+    threads = os.cpu_count() or 1
     if out_fileformat in ("CRAM", "BAM", "SAM"):
         write_mode = (
             "wc"
@@ -370,17 +431,21 @@ def iter_to_file(
             mode=write_mode,
             template=infile,
             reference_filename=reference_filename,
+            threads=threads,
         )
     elif out_fileformat in ("VCF", "BCF"):
         write_mode = "w" if out_fileformat == "VCF" else "wb"
         output = VariantFile(
-            output_filename, mode=write_mode, header=infile.header
+            output_filename,
+            mode=write_mode,
+            header=infile.header,
+            threads=threads,
         )
     else:
         raise ValueError(
             "Unsupported output file type. Supported files: .cram, .bam, .sam, .vcf, .vcf.gz, .bcf."
         )
 
-    for read in gen_iter:
-        output.write(read)
-    output.close()
+    with output:
+        for read in gen_iter:
+            output.write(read)
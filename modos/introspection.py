@@ -4,7 +4,8 @@ This module provides utilities for accessing the schema structure
 and for converting instances to different representations.
 """
 
-from functools import lru_cache, reduce
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
 from typing import Any, Optional
 
@@ -24,22 +25,32 @@ def load_schema() -> SchemaView:
     return SchemaView(SCHEMA_PATH)
 
 
-@lru_cache(1)
+@lru_cache(maxsize=None)
 def load_prefixmap() -> Any:
     """Load the prefixmap."""
-    return SchemaView(SCHEMA_PATH, merge_imports=False).schema.prefixes
+    # The shared view does not merge imports into its root schema,
+    # so its prefixes are those declared in the schema file itself.
+    return load_schema().schema.prefixes
 
 
 def get_slots(target_class: type, required_only=False) -> list[str]:
     """Return a list of required slots for a class."""
-    slots = []
-    class_slots = target_class.__match_args__
+    # Copy so that callers cannot alter the cached slots
+    return list(_get_slots(target_class, required_only))
 
-    for slot_name in class_slots:
-        if not required_only or load_schema().get_slot(slot_name).required:
-            slots.append(slot_name)
 
-    return slots
+@lru_cache(maxsize=None)
+def _get_slots(target_class: type, required_only: bool) -> tuple[str, ...]:
+    class_slots = target_class.__match_args__
+    if not required_only:
+        return tuple(class_slots)
+
+    schema = load_schema()
+    return tuple(
+        slot_name
+        for slot_name in class_slots
+        if schema.get_slot(slot_name).required
+    )
 
 
 def instance_to_graph(instance) -> Graph:
@@ -56,6 +67,7 @@ def instance_to_graph(instance) -> Graph:
     )
 
 
+@lru_cache(maxsize=None)
 def get_slot_range(slot_name: str) -> str:
     """Return the class-independent range of a slot."""
     return load_schema().get_slot(slot_name).range
@@ -65,6 +77,13 @@ def get_enum_values(enum_name: str) -> Optional[list[str]]:
     return list(load_schema().get_enum(enum_name).permissible_values.keys())
 
 
+@lru_cache(1)
+def get_haspart_slots() -> tuple[str, ...]:
+    """Return the names of all subproperties of has_part."""
+    return tuple(load_schema().slot_children("has_part"))
+
+
+@lru_cache(maxsize=None)
 def get_haspart_property(child_class: str) -> Optional[str]:
     """Return the name of the "has_part" property for a target class.
     If no such property is in the schema, return None.
@@ -77,17 +96,16 @@ def get_haspart_property(child_class: str) -> Optional[str]:
     'has_assay'
     """
 
-    # find all subproperties of has_part
-    prop_names = load_schema().slot_children("has_part")
-    for prop_name in prop_names:
+    schema = load_schema()
+    for prop_name in get_haspart_slots():
         targets = get_slot_range(prop_name)
         if isinstance(targets, str):
             targets = [targets]
         # When considering the slot range,
         # include subclasses or targets
-        sub_targets = map(load_schema().get_children, targets)
-        sub_targets = reduce(lambda x, y: x + y, sub_targets)
-        all_targets = targets + [t for t in sub_targets if t]
-        if child_class in all_targets:
+        if child_class in targets:
+            return prop_name
+        sub_targets = chain.from_iterable(map(schema.get_children, targets))
+        if child_class in sub_targets:
             return prop_name
     return None
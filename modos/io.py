@@ -59,20 +59,24 @@ def build_modo_from_file(
     htsget_endpoint: Optional[str] = None,
 ) -> MODO:
     """build a modo from a yaml or json file"""
-    instances = parse_multiple_instances(Path(path))
-    # check for unique ids and fail early
-    ids = [inst.id for inst in instances]
-    if len(ids) > len(set(ids)):
-        dup = {x for x in ids if ids.count(x) > 1}
+    # partition instances and check for unique ids in a single pass
+    modo_inst, elements = [], []
+    ids, dup = set(), set()
+    for instance in parse_multiple_instances(Path(path)):
+        if instance.id in ids:
+            dup.add(instance.id)
+        ids.add(instance.id)
+        # use full id for has_part attributes
+        instance = update_haspart_id(instance)
+        if isinstance(instance, model.MODO):
+            modo_inst.append(instance)
+        else:
+            elements.append(instance)
+    # fail early
+    if dup:
         raise ValueError(
             f"Please specify a unique ID. Element(s) with ID(s) {dup} already exist."
         )
-    # use full id for has_part attributes
-    instances = [update_haspart_id(inst) for inst in instances]
-
-    modo_inst = [
-        instance for instance in instances if isinstance(instance, model.MODO)
-    ]
     if len(modo_inst) != 1:
         raise ValueError(
             f"There must be exactly 1 MODO in the input file. Found {len(modo_inst)}"
@@ -85,16 +89,17 @@ def build_modo_from_file(
         htsget_endpoint=htsget_endpoint,
         **modo_dict,
     )
-    for instance in instances:
-        if not isinstance(instance, model.MODO):
-            # copy data-path into modo
-            if (
-                isinstance(instance, model.DataEntity)
-                and not modo.path in Path(instance.data_path).parents
-            ):
-                data_file = instance.data_path
-                instance.data_path = Path(data_file).name
-                modo.add_element(instance, data_file=data_file)
-            else:
-                modo.add_element(instance)
+    items = []
+    for instance in elements:
+        # copy data-path into modo
+        if (
+            isinstance(instance, model.DataEntity)
+            and not modo.path in Path(instance.data_path).parents
+        ):
+            data_file = instance.data_path
+            instance.data_path = Path(data_file).name
+            items.append((instance, data_file))
+        else:
+            items.append(instance)
+    modo.add_elements(items)
     return modo
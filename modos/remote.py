@@ -4,9 +4,12 @@ from pydantic import HttpUrl
 import requests
 from typing import Mapping, Optional
 
+# Reuse connections to the modos server across requests
+SESSION = requests.Session()
+
 
 def list_remote_items(remote_url: HttpUrl) -> list[HttpUrl]:
-    return requests.get(url=remote_url + "/list").json()
+    return SESSION.get(url=remote_url + "/list").json()
 
 
 def get_metadata_from_remote(
@@ -21,7 +24,7 @@ def get_metadata_from_remote(
     id
         id of the modo to retrieve metadata from. Will return all if not specified (default).
     """
-    meta = requests.get(url=remote_url + "/meta").json()
+    meta = SESSION.get(url=remote_url + "/meta").json()
     if modo_id is not None:
         try:
             return meta[modo_id]
@@ -46,7 +49,7 @@ def get_s3_path(
     exact_match
         if True only modos with exactly that id will be returned, otherwise (default) all matching modos
     """
-    return requests.get(
+    return SESSION.get(
         url=remote_url + "/get",
         params={"query": query, "exact_match": exact_match},
     ).json()
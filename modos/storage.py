@@ -3,7 +3,6 @@ from pathlib import Path
 import shutil
 from typing import Any, Generator, Optional
 
-import s3fs
 import zarr
 import zarr.hierarchy as zh
 
@@ -95,11 +94,14 @@ class S3Storage(Storage):
         s3_endpoint: dict[str, Any],
         s3_kwargs: dict[str, Any],
     ):
+        # NOTE: s3fs is slow to import and only needed for remote storage
+        import s3fs
+
         self._path = Path(path)
         self.endpoint = s3_endpoint
         s3_opts = s3_kwargs or {"anon": True}
         fs = s3fs.S3FileSystem(endpoint_url=s3_endpoint, **s3_opts)
-        if fs.exists(str(self.path / ZARR_ROOT)):
+        if s3_prefix_exists(fs, self.path / ZARR_ROOT):
             zarr_s3_opts = s3_opts | {"endpoint_url": s3_endpoint}
 
             self._zarr = zarr.convenience.open(
@@ -131,7 +133,7 @@ class S3Storage(Storage):
         fs = self.zarr.store.fs
         path = self.path / (target or "")
         for node in fs.glob(f"{path}/*"):
-            if Path(node).name.endswith(".zarr"):
+            if node.endswith(".zarr"):
                 continue
             elif fs.isfile(node):
                 yield Path(node)
@@ -150,6 +152,23 @@ class S3Storage(Storage):
         self.zarr.store.fs.put_file(source, self.path / Path(target))
 
 
+def s3_prefix_exists(fs, path: Path) -> bool:
+    """Check whether any object exists under a prefix of an S3 bucket.
+    This is done with a single listing request, whereas fs.exists
+    issues several requests when the key does not exist.
+    """
+    bucket, key, _ = fs.split_path(str(path))
+    if not key:
+        return fs.exists(bucket)
+    resp = fs.call_s3(
+        "list_objects_v2",
+        Bucket=bucket,
+        Prefix=key.rstrip("/") + "/",
+        MaxKeys=1,
+    )
+    return resp.get("KeyCount", 0) > 0
+
+
 # Initialize object's directory given the metadata graph
 def init_zarr(zarr_store: zarr.storage.Store) -> zh.Group:
     """Initialize object's directory and metadata structure."""
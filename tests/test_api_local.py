@@ -1,12 +1,20 @@
 """Tests for the local use of multi-omics digital object (modo) API
 """
 
+from datetime import date
+from io import BytesIO
+from pathlib import Path
+
+import modos.helpers
 from modos.api import MODO
+from modos.helpers import bytesio_to_iterator
 from modos.io import build_modo_from_file
 
 import modos_schema.datamodel as model
 import pysam
+import pytest
 import re
+import zarr
 
 ## Initialize modo
 
@@ -39,6 +47,57 @@ def test_add_data(data_entity, tmp_path):
     assert "demo1.cram.crai" in [fi.name for fi in modo.list_files()]
 
 
+def test_add_element_batch(assay, sample, tmp_path):
+    modo = MODO(tmp_path)
+    with modo.batch():
+        modo.add_element(assay)
+        modo.add_element(sample, part_of="assay/test_assay")
+    root = zarr.convenience.open_consolidated(modo.zarr.store)
+    assert "sample/test_sample" in root["assay/test_assay"].attrs.get(
+        "has_sample"
+    )
+
+
+def test_add_elements(assay, sample, tmp_path):
+    modo = MODO(tmp_path)
+    modo.add_elements([assay, (sample, None, "assay/test_assay")])
+    root = zarr.convenience.open_consolidated(modo.zarr.store)
+    assert "sample/test_sample" in root["assay/test_assay"].attrs.get(
+        "has_sample"
+    )
+    with pytest.raises(ValueError):
+        modo.add_elements([sample])
+
+
+def test_add_elements_same_parent(assay, tmp_path):
+    modo = MODO(tmp_path)
+    samples = [
+        model.Sample(id=f"s{i}", name=f"s{i}", taxon_id="9606")
+        for i in range(3)
+    ]
+    modo.add_elements(
+        [assay] + [(s, None, "assay/test_assay") for s in samples]
+    )
+    assert modo.metadata["assay/test_assay"]["has_sample"] == [
+        "sample/s0",
+        "sample/s1",
+        "sample/s2",
+    ]
+
+
+def test_metadata_after_update_date(test_modo):
+    test_modo.update_date(date(2000, 1, 1))
+    assert test_modo.metadata["ex"]["last_update_date"] == "2000-01-01"
+
+
+def test_element_names(assay, test_modo):
+    test_modo.add_element(assay)
+    assert test_modo.element_names() == {
+        id.rsplit("/", 1)[-1] for id in test_modo.metadata.keys()
+    }
+    assert "test_assay" in test_modo.element_names()
+
+
 def test_add_to_parent(sample, test_modo):
     test_modo.add_element(sample, part_of="assay/assay1")
     assert "sample/test_sample" in test_modo.metadata["assay/assay1"].get(
@@ -62,6 +121,12 @@ def test_remove_element_link_list(test_modo):
     ].values()
 
 
+def test_remove_element_link_root(test_modo):
+    assert "assay/assay1" in test_modo.zarr.attrs["has_assay"]
+    test_modo.remove_element("assay/assay1")
+    assert "assay/assay1" not in test_modo.zarr.attrs["has_assay"]
+
+
 ## Update element
 
 
@@ -77,8 +142,9 @@ def test_update_element(test_modo):
 
 
 def test_enrich_metadata(test_modo):
-    test_modo.enrich_metadata()
+    changed = test_modo.enrich_metadata()
     assert "sequence/BA000007.3_bd7522" in test_modo.metadata.keys()
+    assert "sequence/BA000007.3_bd7522" in changed
 
 
 ## Stream cram
@@ -100,3 +166,52 @@ def test_stream_genomics_region(test_modo):
         reference_filename="data/ex/reference1.fa",
     )
     assert isinstance(seq, pysam.libcalignmentfile.IteratorRowRegion)
+
+
+def test_stream_genomics_missing_file(test_modo):
+    with pytest.raises(ValueError):
+        test_modo.stream_genomics(file_path="data/ex/demo1.cram")
+
+
+## Slice buffers
+
+
+def test_bytesio_to_iterator_cram():
+    ref = "data/ex/reference1.fa"
+    buffer = BytesIO(Path("data/ex/demo1.cram").read_bytes())
+    source = pysam.AlignmentFile("data/ex/demo1.cram", reference_filename=ref)
+    records = list(bytesio_to_iterator(buffer, "CRAM", None, ref))
+    assert len(records) == sum(1 for _ in source.fetch(until_eof=True))
+    records = list(
+        bytesio_to_iterator(buffer, "CRAM", "BA000007.3:1000-2000", ref)
+    )
+    assert len(records) == source.count("BA000007.3", 1000, 2000)
+
+
+def test_bytesio_to_iterator_bcf():
+    buffer = BytesIO(Path("data/ex/calls1.bcf").read_bytes())
+    source = pysam.VariantFile("data/ex/calls1.bcf")
+    records = list(bytesio_to_iterator(buffer, "BCF", None))
+    assert len(records) == sum(1 for _ in source)
+    records = list(bytesio_to_iterator(buffer, "BCF", "BA000007.3:1000-5000"))
+    expected = list(source.fetch("BA000007.3", 1000, 5000))
+    assert 0 < len(records) == len(expected)
+
+
+def test_bytesio_to_iterator_unindexed(monkeypatch):
+    def fail(*args):
+        raise OSError("cannot index")
+
+    # filtering without an index must match an indexed fetch
+    monkeypatch.setattr(modos.helpers, "index_genomic_file", fail)
+    ref = "data/ex/reference1.fa"
+    buffer = BytesIO(Path("data/ex/demo1.cram").read_bytes())
+    source = pysam.AlignmentFile("data/ex/demo1.cram", reference_filename=ref)
+    records = list(
+        bytesio_to_iterator(buffer, "CRAM", "BA000007.3:1000-2000", ref)
+    )
+    assert len(records) == source.count("BA000007.3", 1000, 2000)
+    buffer = BytesIO(Path("data/ex/calls1.bcf").read_bytes())
+    source = pysam.VariantFile("data/ex/calls1.bcf")
+    records = list(bytesio_to_iterator(buffer, "BCF", "BA000007.3:1000-5000"))
+    assert len(records) == len(list(source.fetch("BA000007.3", 1000, 5000)))
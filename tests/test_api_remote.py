@@ -3,6 +3,7 @@
 
 from modos.api import MODO
 from modos.io import build_modo_from_file
+from modos.storage import s3_prefix_exists
 
 import modos_schema.datamodel as model
 import pytest
@@ -22,6 +23,13 @@ def test_multi_modos(setup):
         )
 
 
+@pytest.mark.slow
+def test_s3_prefix_exists(remote_modo):
+    fs = remote_modo.zarr.store.fs
+    assert s3_prefix_exists(fs, remote_modo.path)
+    assert not s3_prefix_exists(fs, remote_modo.path / "missing")
+
+
 ## Add element
 
 
@@ -100,4 +100,29 @@ def test_remove_element_link_list(test_modo, tmp_path):
     )
     result = runner.invoke(cli, ["remove", str(tmp_path), "sample/sample1"])
     assert result.exit_code == 0
-    assert test_modo.zarr["assay/assay1"].attrs["has_sample"] is None
+    assert test_modo.zarr["assay/assay1"].attrs["has_sample"] == []
+
+
+def test_remove_data_abort(test_modo, tmp_path):
+    result = runner.invoke(
+        cli, ["remove", str(tmp_path), "data/demo1"], input="n\n"
+    )
+    assert result.exit_code == 1
+    assert "data/demo1" in test_modo.metadata.keys()
+
+
+## Publish
+
+
+def test_publish(test_modo, tmp_path):
+    result = runner.invoke(cli, ["publish", str(tmp_path)])
+    assert result.exit_code == 0
+    assert "modos:MODO" in result.stdout
+
+
+def test_remove_data_abort_unnormalized_id(test_modo, tmp_path):
+    result = runner.invoke(
+        cli, ["remove", str(tmp_path), "/data/demo1"], input="n\n"
+    )
+    assert result.exit_code == 1
+    assert (tmp_path / "demo1.cram").exists()